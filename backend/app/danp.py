@@ -6,10 +6,41 @@ def normalize_by_row(T: np.ndarray) -> np.ndarray:
     return T / row_sum[:, None]
 
 
-def compute_danp_weights(T: np.ndarray, power: int = 50):
+def stationary_distribution(W: np.ndarray) -> np.ndarray:
+    # Solve (W - I) v = 0 with 1^T v = 1 as one least-squares system
+    n = W.shape[0]
+    M = np.vstack([W - np.eye(n, dtype=W.dtype), np.ones((1, n), dtype=W.dtype)])
+    b = np.zeros(n + 1, dtype=W.dtype)
+    b[-1] = 1.0
+    v, *_ = np.linalg.lstsq(M, b, rcond=None)
+    return v / np.sum(v)
+
+
+def compute_danp_weights(T: np.ndarray, power: int = 50, tol: float = 1e-12):
     T_norm = normalize_by_row(T)
-    W = T_norm.T
-    limit = np.linalg.matrix_power(W, power)
-    weights = limit[:, 0]
-    weights = weights / np.sum(weights)
+    # Materialize the transpose once so the matvecs below stream W row by row
+    W = np.ascontiguousarray(T_norm.T)
+    n = W.shape[0]
+
+    # A strictly positive W is primitive, so its stationary distribution is
+    # unique and equals the limit of W^p; get it from a single direct solve
+    if np.all(T > 0):
+        return stationary_distribution(W)
+
+    # Otherwise fall back to power iteration on W instead of forming W^power;
+    # `power` is kept as the iteration cap for backward compatibility.
+    # Starting from e_0 tracks the first column of W^p, which is what the
+    # weights have always been, also for reducible W where the limit depends
+    # on the starting vector.
+    # A tolerance below the working precision would never be reached
+    tol = max(tol, 4 * np.finfo(W.dtype).eps)
+    weights = np.zeros(n, dtype=W.dtype)
+    weights[0] = 1.0
+    for _ in range(power):
+        v = W @ weights
+        v /= np.sum(v)
+        converged = np.max(np.abs(v - weights)) < tol
+        weights = v
+        if converged:
+            break
     return weights
@@ -1,4 +1,9 @@
+import warnings
 import numpy as np
+from scipy.linalg import LinAlgWarning, lu_factor, lu_solve
+
+# Above this condition number of (I - D), float32 input is factored in float64 instead
+FLOAT32_COND_LIMIT = 1e6
 
 
 def normalize_matrix(A: np.ndarray) -> np.ndarray:
@@ -8,7 +13,9 @@ def normalize_matrix(A: np.ndarray) -> np.ndarray:
     if row_sum == 0 or col_sum == 0:
         raise ValueError("Cannot normalize: matrix has zero sums")
     
-    s = 1 / max(row_sum, col_sum)
+    # Keep float inputs in their own precision; integer inputs are promoted to float64
+    dtype = A.dtype if np.issubdtype(A.dtype, np.floating) else np.dtype(np.float64)
+    s = dtype.type(1 / max(row_sum, col_sum))
     D = s * A
     
     if np.any(np.isnan(D)) or np.any(np.isinf(D)):
@@ -17,22 +24,51 @@ def normalize_matrix(A: np.ndarray) -> np.ndarray:
     return D
 
 
+def _influence_lu(D: np.ndarray):
+    # Factors (I - D)^T: the transpose of the C-ordered temporary is already in
+    # LAPACK's Fortran order, so getrf works on it in place without a copy.
+    # I - D itself is built by negating D and bumping the diagonal, with no identity.
+    M = -D
+    np.fill_diagonal(M, M.diagonal() + 1)
+    if M.dtype == np.float32 and np.linalg.cond(M) > FLOAT32_COND_LIMIT:
+        M = M.astype(np.float64)
+    # lu_factor only warns on an exactly zero pivot; raise like np.linalg does
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", LinAlgWarning)
+        lu, piv = lu_factor(M.T, overwrite_a=True, check_finite=False)
+    if np.any(np.diag(lu) == 0):
+        raise np.linalg.LinAlgError("Singular matrix")
+    return lu, piv
+
+
 def total_influence_matrix(D: np.ndarray) -> np.ndarray:
-    I = np.eye(D.shape[0])
-    return D @ np.linalg.inv(I - D)
+    # T = D (I - D)^-1  <=>  (I - D)^T T^T = D^T, so one LU of (I - D)^T is enough.
+    # D.T and the solution are Fortran-ordered, so the result's .T is C-ordered T.
+    return lu_solve(_influence_lu(D), D.T, check_finite=False).T
 
 
 def simplify_matrix(T: np.ndarray) -> np.ndarray:
-    alpha = np.mean(T)
-    Ts = np.where(T >= alpha, T, 0.0)
+    alpha = T.mean()
+    # A masked store rather than multiplying by the mask, which would turn
+    # negative entries below alpha into -0.0
+    Ts = T.copy()
+    np.copyto(Ts, 0, where=T < alpha)
     # Zero diagonal entries that are below alpha (they were already zeroed above);
     # entries >= alpha on diagonal are intentionally kept (per paper convention)
     return Ts
 
 
 def prominence_relation(T: np.ndarray):
-    d = np.sum(T, axis=1)
-    r = np.sum(T, axis=0)
-    prominence = d + r
-    relation = d - r
-    return d, r, prominence, relation
+    # Row sums are contiguous reductions; the column sums walk T once more
+    # in row order, so each reduction streams T exactly once
+    d = T.sum(axis=1)
+    r = T.sum(axis=0)
+    return d, r, d + r, d - r
+
+
+def run_dematel(A: np.ndarray):
+    # Same outputs, in the same order, as the compiled kernels in kernels.py
+    D = normalize_matrix(A)
+    T = total_influence_matrix(D)
+    d, r, prominence, relation = prominence_relation(T)
+    return d, r, prominence, relation, T, simplify_matrix(T)
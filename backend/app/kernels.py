@@ -0,0 +1,150 @@
+import numpy as np
+from numba import njit
+
+from .dematel import FLOAT32_COND_LIMIT
+from .schemas import COMPUTE_DTYPE
+
+# Compiling these kernels takes seconds, so main.py imports this module and
+# calls warm_up() in a background thread. cache=True persists the machine code
+# in __pycache__, or in NUMBA_CACHE_DIR when the source tree is read-only.
+
+# Sizes routed to small_dematel_pipeline: the 3x3 to 8x8 questionnaires that
+# make up nearly all requests
+SPECIALIZED_SIZES = range(3, 9)
+
+# fastmath without the no-NaN/no-Inf assumptions, so finiteness checks survive
+FASTMATH = {"reassoc", "contract", "arcp", "nsz", "afn"}
+
+
+@njit(cache=True, fastmath=FASTMATH)
+def _normalize(A, n):
+    row_max = 0.0
+    col_max = 0.0
+    for i in range(n):
+        row = 0.0
+        col = 0.0
+        for j in range(n):
+            row += A[i, j]
+            col += A[j, i]
+        if i == 0 or row > row_max:
+            row_max = row
+        if i == 0 or col > col_max:
+            col_max = col
+    D = (A * (1.0 / max(row_max, col_max))).astype(A.dtype)
+
+    # Signed input can push D past the float32 range; LAPACK must never see NaN/Inf
+    if not np.isfinite(D).all():
+        raise ValueError("Normalization resulted in invalid values")
+    return D
+
+
+@njit(cache=True, fastmath=FASTMATH)
+def _summarize(T, n):
+    d = np.zeros(n, dtype=T.dtype)
+    r = np.zeros(n, dtype=T.dtype)
+    total = 0.0
+    for i in range(n):
+        for j in range(n):
+            d[i] += T[i, j]
+            r[j] += T[i, j]
+        total += d[i]
+    alpha = total / (n * n)
+
+    Ts = np.empty_like(T)
+    for i in range(n):
+        for j in range(n):
+            Ts[i, j] = T[i, j] if T[i, j] >= alpha else 0.0
+
+    return d, r, d + r, d - r, T, Ts
+
+
+@njit(cache=True, fastmath=FASTMATH)
+def dematel_pipeline(A):
+    # Whole DEMATEL pass (normalize, total influence, simplify, prominence/relation)
+    # compiled into one call, so small matrices don't pay per-op NumPy dispatch
+    n = A.shape[0]
+    D = _normalize(A, n)
+
+    # T = D (I - D)^-1  <=>  (I - D)^T T^T = D^T
+    # The transposes are Fortran-ordered views, which is the layout LAPACK wants
+    M = -D
+    for i in range(n):
+        M[i, i] += 1.0
+    Mt = M.T
+    Dt = D.T
+    if A.itemsize == 4 and np.linalg.cond(M) > FLOAT32_COND_LIMIT:
+        Tt = np.linalg.solve(Mt.astype(np.float64), Dt.astype(np.float64)).astype(A.dtype)
+    else:
+        Tt = np.linalg.solve(Mt, Dt)
+
+    return _summarize(Tt.T, n)
+
+
+@njit(cache=True, fastmath=FASTMATH)
+def _small_total_influence(D, n):
+    # Solves (I - D)^T T^T = D^T by Gaussian elimination with partial pivoting in
+    # float64. Input may have signed entries, so pivoting is needed for
+    # stability; an exactly zero pivot is reported like LAPACK's getrf does.
+    B = np.empty((n, n))
+    C = np.empty((n, n))
+    for i in range(n):
+        for j in range(n):
+            B[i, j] = -D[j, i]
+            C[i, j] = D[j, i]
+        B[i, i] += 1.0
+
+    for k in range(n):
+        p = k
+        for i in range(k + 1, n):
+            if abs(B[i, k]) > abs(B[p, k]):
+                p = i
+        if B[p, k] == 0.0:
+            raise np.linalg.LinAlgError("Singular matrix")
+        if p != k:
+            for j in range(n):
+                B[k, j], B[p, j] = B[p, j], B[k, j]
+                C[k, j], C[p, j] = C[p, j], C[k, j]
+
+        inv = 1.0 / B[k, k]
+        for i in range(k + 1, n):
+            f = B[i, k] * inv
+            for j in range(k + 1, n):
+                B[i, j] -= f * B[k, j]
+            for j in range(n):
+                C[i, j] -= f * C[k, j]
+
+    for k in range(n - 1, -1, -1):
+        inv = 1.0 / B[k, k]
+        for j in range(n):
+            s = C[k, j]
+            for m in range(k + 1, n):
+                s -= B[k, m] * C[m, j]
+            C[k, j] = s * inv
+
+    T = np.empty((n, n), dtype=D.dtype)
+    for i in range(n):
+        for j in range(n):
+            T[i, j] = C[j, i]
+    return T
+
+
+@njit(cache=True, fastmath=FASTMATH)
+def small_dematel_pipeline(A):
+    # Same result as dematel_pipeline; for small matrices the inline elimination
+    # beats the LAPACK call and its layout copies. Working in float64 also makes
+    # the float32 condition-number check unnecessary.
+    n = A.shape[0]
+    D = _normalize(A, n)
+    return _summarize(_small_total_influence(D, n), n)
+
+
+def run_dematel(A):
+    pipeline = small_dematel_pipeline if A.shape[0] in SPECIALIZED_SIZES else dematel_pipeline
+    return pipeline(A)
+
+
+def warm_up():
+    # Compile both kernels for the request dtype
+    A = np.array([[0.0, 1.0], [0.5, 0.0]], dtype=COMPUTE_DTYPE)
+    dematel_pipeline(A)
+    small_dematel_pipeline(A)
@@ -1,16 +1,39 @@
 import sys
+import logging
+import threading
 import numpy as np
 from pathlib import Path
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 
 # Relative imports within app package
-from .dematel import normalize_matrix, total_influence_matrix, prominence_relation, simplify_matrix
+from . import dematel
 from .danp import compute_danp_weights
 from .schemas import MatrixInput
 from .utils import validate_matrix
 
-app = FastAPI(title="Hospitality Innovation DSS")
+# /analyze runs the NumPy pipeline until the numba kernels have compiled in the
+# background, so a cold start neither imports numba nor waits for the JIT
+_run_dematel = dematel.run_dematel
+
+
+def _compile_kernels():
+    global _run_dematel
+    try:
+        from . import kernels
+        kernels.warm_up()
+    except Exception:
+        logging.getLogger(__name__).exception("Compiling the DEMATEL kernels failed; staying on NumPy")
+        return
+    _run_dematel = kernels.run_dematel
+
+
+threading.Thread(target=_compile_kernels, daemon=True).start()
+
+app = FastAPI(title="Hospitality Innovation DSS", default_response_class=ORJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -20,6 +43,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.exception_handler(RequestValidationError)
+async def validation_exception_handler(request: Request, exc: RequestValidationError):
+    # The default handler echoes the input through json.dumps, which fails on a
+    # NaN/Infinity literal; orjson writes those as null
+    return ORJSONResponse(status_code=422, content={"detail": jsonable_encoder(exc.errors())})
+
 @app.get("/")
 def read_root():
     return {"message": "Backend is running!"}
@@ -31,39 +60,35 @@ def health_check():
 @app.post("/analyze")
 def analyze(data: MatrixInput):
     try:
-        A = np.array(data.matrix)
+        A = data.matrix
         validate_matrix(A)
 
-        D = normalize_matrix(A)
-        T = total_influence_matrix(D)
-        T_simplified = simplify_matrix(T)
-
-        d, r, prominence, relation = prominence_relation(T)
+        d, r, prominence, relation, T, T_simplified = _run_dematel(A)
         weights = compute_danp_weights(T)
         
-        if (np.any(np.isnan(d)) or np.any(np.isinf(d)) or
-            np.any(np.isnan(r)) or np.any(np.isinf(r)) or
-            np.any(np.isnan(prominence)) or np.any(np.isinf(prominence)) or
-            np.any(np.isnan(relation)) or np.any(np.isinf(relation)) or
-            np.any(np.isnan(weights)) or np.any(np.isinf(weights))):
+        # prominence and relation are d + r and d - r, so they are finite whenever d and r are
+        if not (np.isfinite(d).all() and np.isfinite(r).all() and np.isfinite(weights).all()):
             raise ValueError("Calculation resulted in invalid values.")
 
-        ranking = sorted(
-            zip(data.labels, weights),
-            key=lambda x: x[1],
-            reverse=True
-        )
-
-        return {
-            "total_influence_matrix": T.tolist(),
-            "simplified_total_influence_matrix": T_simplified.tolist(),
-            "d": d.tolist(),
-            "r": r.tolist(),
-            "prominence": prominence.tolist(),
-            "relation": relation.tolist(),
-            "weights": weights.tolist(),
+        # Stable sort keeps tied criteria in input order, as sorted(reverse=True) did.
+        # Like zip(), only criteria that have a label are ranked.
+        n_labels = len(data.labels)
+        order = np.argsort(-weights[:n_labels], kind="stable")
+        # weights[i] stays a numpy scalar so orjson writes it exactly as in "weights"
+        ranking = [(data.labels[i], weights[i]) for i in order]
+
+        # Returned as a response so orjson serializes the arrays straight from their buffers
+        # instead of going through jsonable_encoder and .tolist()
+        return ORJSONResponse({
+            "total_influence_matrix": T,
+            "simplified_total_influence_matrix": T_simplified,
+            "d": d,
+            "r": r,
+            "prominence": prominence,
+            "relation": relation,
+            "weights": weights,
             "ranking": ranking
-        }
+        })
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -1,7 +1,40 @@
-from pydantic import BaseModel
-from typing import List
+from pydantic import BaseModel, ConfigDict, WithJsonSchema, field_validator
+from typing import Annotated, List
+import numpy as np
+
+# Precision used for the DEMATEL/DANP computation; float32 halves the memory
+# traffic and is ample for the small matrices this endpoint receives
+COMPUTE_DTYPE = np.float32
+
+# Still documented as a list of lists in the OpenAPI schema
+MatrixArray = Annotated[
+    np.ndarray,
+    WithJsonSchema({"type": "array", "items": {"type": "array", "items": {"type": "number"}}}),
+]
 
 
 class MatrixInput(BaseModel):
-    matrix: List[List[float]]
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    matrix: MatrixArray
     labels: List[str]
+
+    @field_validator("matrix", mode="before")
+    @classmethod
+    def to_array(cls, v):
+        # Build the ndarray straight from the request data instead of a nested list.
+        # pydantic only turns ValueError into a 422, so TypeError (e.g. an object
+        # entry) is re-raised as one.
+        try:
+            with np.errstate(over="ignore"):
+                A = np.asarray(v, dtype=COMPUTE_DTYPE)
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Matrix must be a list of rows of numbers ({e})") from e
+        if A.ndim != 2:
+            raise ValueError("Matrix must be two-dimensional")
+        # null becomes NaN and values beyond the float32 range become Inf
+        if not np.isfinite(A).all():
+            raise ValueError(
+                f"Matrix values must be finite numbers no larger than {np.finfo(COMPUTE_DTYPE).max:.3g}"
+            )
+        return A
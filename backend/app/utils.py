@@ -5,13 +5,17 @@ def validate_matrix(A: np.ndarray):
     if A.shape[0] != A.shape[1]:
         raise ValueError("Matrix must be square")
     
-    # Check if matrix is all zeros
-    if np.allclose(A, 0):
+    # NaN/Inf would reach LAPACK inside the compiled kernels, which aborts the process
+    if not np.isfinite(A).all():
+        raise ValueError("Matrix contains invalid values (NaN or infinity).")
+    
+    # Check if matrix is all zeros (exact test, no tolerance pass like np.allclose)
+    if not A.any():
         raise ValueError("Matrix cannot be all zeros. Please enter some values.")
     
     # Check if any row sum and column sum are all zero
-    row_sum = np.sum(A, axis=1)
-    col_sum = np.sum(A, axis=0)
+    row_sum = A.sum(axis=1)
+    col_sum = A.sum(axis=0)
     
-    if np.any(row_sum == 0) or np.any(col_sum == 0):
+    if (row_sum == 0).any() or (col_sum == 0).any():
         raise ValueError("All rows and columns must have at least one non-zero value.")
@@ -5,9 +5,22 @@ Run with: pytest test_cases.py -v
 
 import pytest
 import numpy as np
-from app.dematel import normalize_matrix, total_influence_matrix, prominence_relation
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from app.dematel import normalize_matrix, total_influence_matrix, prominence_relation, simplify_matrix
 from app.danp import compute_danp_weights
+from app.kernels import dematel_pipeline, small_dematel_pipeline
+from app import dematel, kernels, main
 from app.utils import validate_matrix
+from app.schemas import MatrixInput
+from app.main import app, analyze
+from pydantic import ValidationError
+
+
+def limit_supermatrix(T, power=50):
+    """Reference DANP limit supermatrix W^power, W the transposed row-normalized T"""
+    W = (T / T.sum(axis=1)[:, None]).T
+    return np.linalg.matrix_power(W, power)
 
 
 class TestValidateMatrix:
@@ -46,6 +59,16 @@ class TestValidateMatrix:
         with pytest.raises(ValueError, match="All rows and columns must have"):
             validate_matrix(A)
     
+    def test_non_finite_matrix_raises_error(self):
+        """NaN or Inf entries should raise ValueError"""
+        for bad in (np.nan, np.inf, -np.inf):
+            A = np.array([[0, 1, 2],
+                          [1, 0, 1],
+                          [2, 1, 0]], dtype=float)
+            A[0, 1] = bad
+            with pytest.raises(ValueError, match="invalid values"):
+                validate_matrix(A)
+
     def test_valid_matrix_passes(self):
         """Valid matrix should pass validation"""
         A = np.array([[0, 1, 2, 3],
@@ -125,6 +148,64 @@ class TestTotalInfluenceMatrix:
         
         assert T.shape[0] == T.shape[1], "Total influence matrix is not square"
 
+    def test_total_influence_matches_closed_form(self):
+        """Test that T equals D (I - D)^-1"""
+        A = np.array([[0, 1, 2, 3],
+                      [1, 0, 1, 1],
+                      [2, 1, 0, 2],
+                      [3, 1, 2, 0]], dtype=float)
+        D = normalize_matrix(A)
+        T = total_influence_matrix(D)
+
+        expected = D @ np.linalg.inv(np.eye(D.shape[0]) - D)
+        assert np.allclose(T, expected), "T ≠ D (I - D)^-1"
+
+    @pytest.mark.parametrize("dtype", [np.float32, np.float64])
+    def test_total_influence_singular_raises_error(self, dtype):
+        """Equal row sums make I - D singular, which raises LinAlgError"""
+        A = (np.ones((3, 3)) - np.eye(3)).astype(dtype)
+        D = normalize_matrix(A)
+        with pytest.raises(np.linalg.LinAlgError, match="Singular matrix"):
+            total_influence_matrix(D)
+
+    def test_total_influence_float32(self):
+        """Test that float32 input stays float32 and matches float64 result"""
+        A = np.array([[0, 1, 2, 3],
+                      [1, 0, 1, 1],
+                      [2, 1, 0, 2],
+                      [3, 1, 2, 0]], dtype=float)
+        T64 = total_influence_matrix(normalize_matrix(A))
+        T32 = total_influence_matrix(normalize_matrix(A.astype(np.float32)))
+
+        assert T32.dtype == np.float32, "float32 input was promoted"
+        assert np.allclose(T32, T64, rtol=1e-5), "float32 result diverges from float64"
+
+
+class TestSimplifyMatrix:
+    """Test threshold simplification of T"""
+
+    def test_simplify_zeroes_entries_below_mean(self):
+        """Entries below the mean are zeroed, the rest are kept"""
+        T = np.array([[0.1, 0.5, 0.2],
+                      [0.4, 0.1, 0.6],
+                      [0.3, 0.2, 0.1]])
+        Ts = simplify_matrix(T)
+
+        expected = np.where(T >= T.mean(), T, 0.0)
+        assert np.array_equal(Ts, expected), "Simplified matrix is incorrect"
+        assert T[0, 0] == 0.1, "Input matrix was modified"
+
+    def test_simplify_zeroes_are_positive(self):
+        """Negative entries below the mean become +0.0, not -0.0"""
+        T = np.array([[-0.1, 0.5, -0.2],
+                      [0.4, -0.3, 0.6],
+                      [0.3, -0.2, 0.1]])
+        Ts = simplify_matrix(T)
+
+        zeroed = T < T.mean()
+        assert np.all(Ts[zeroed] == 0), "Entries below alpha were kept"
+        assert not np.any(np.signbit(Ts[zeroed])), "Zeroed entries are -0.0"
+
 
 class TestProminenceRelation:
     """Test prominence and relation calculations"""
@@ -238,6 +319,266 @@ class TestDANPWeights:
         
         assert np.all(weights >= 0), "Weights contain negative values"
 
+    def test_danp_weights_match_limit_matrix(self):
+        """Test that DANP weights match a column of the limit supermatrix"""
+        A = np.array([[0, 1, 2, 3],
+                      [1, 0, 1, 1],
+                      [2, 1, 0, 2],
+                      [3, 1, 2, 0]], dtype=float)
+        D = normalize_matrix(A)
+        T = total_influence_matrix(D)
+
+        limit = limit_supermatrix(T)[:, 0]
+        expected = limit / np.sum(limit)
+
+        weights = compute_danp_weights(T)
+
+        assert np.allclose(weights, expected), "Weights differ from limit supermatrix"
+
+    def test_danp_weights_with_zero_influence(self):
+        """T with zero entries should use power iteration and match the limit"""
+        T = np.array([[0.2, 0.5, 0.0],
+                      [0.3, 0.1, 0.6],
+                      [0.5, 0.4, 0.3]])
+        limit = limit_supermatrix(T)[:, 0]
+        expected = limit / np.sum(limit)
+
+        weights = compute_danp_weights(T)
+
+        assert np.allclose(weights, expected), "Weights differ from limit supermatrix"
+
+    def test_danp_weights_reducible_matrix(self):
+        """Block-diagonal T keeps the first column of the limit supermatrix"""
+        block = np.array([[0.2, 0.5, 0.1],
+                          [0.3, 0.1, 0.6],
+                          [0.5, 0.4, 0.3]])
+        T = np.zeros((6, 6))
+        T[:3, :3] = block
+        T[3:, 3:] = block.T
+
+        limit = limit_supermatrix(T)[:, 0]
+        expected = limit / np.sum(limit)
+
+        weights = compute_danp_weights(T)
+
+        assert np.allclose(weights, expected), "Weights differ from limit supermatrix"
+        assert np.all(weights[3:] == 0), "Weight leaked into the unreachable block"
+
+
+class TestDematelPipeline:
+    """Test the compiled DEMATEL kernel against the reference functions"""
+
+    def test_pipeline_matches_reference(self):
+        """Compiled pipeline should match normalize/total/simplify/prominence"""
+        A = np.array([[0, 1, 2, 3],
+                      [1, 0, 1, 1],
+                      [2, 1, 0, 2],
+                      [3, 1, 2, 0]], dtype=float)
+        T = total_influence_matrix(normalize_matrix(A))
+        expected = prominence_relation(T) + (T, simplify_matrix(T))
+
+        result = dematel_pipeline(A)
+
+        for got, want in zip(result, expected):
+            assert np.allclose(got, want), "Compiled pipeline differs from reference"
+
+    def test_pipeline_singular_matrix_raises_error(self):
+        """Equal row sums make I - D singular; both kernels raise LinAlgError"""
+        A = np.array([[0, 1, 1],
+                      [1, 0, 1],
+                      [1, 1, 0]], dtype=np.float32)
+        for pipeline in (dematel_pipeline, small_dematel_pipeline):
+            with pytest.raises(np.linalg.LinAlgError):
+                pipeline(A)
+
+    def test_small_pipeline_signed_entries(self):
+        """Small kernel pivots, so signed input matches the LAPACK kernel"""
+        A = np.array([[0, -2, 1, 3],
+                      [1, 0, -1, 2],
+                      [-3, 1, 0, 1],
+                      [2, 2, -1, 0]], dtype=float)
+        expected = dematel_pipeline(A)
+        result = small_dematel_pipeline(A)
+        for got, want in zip(result, expected):
+            assert np.allclose(got, want), "Small kernel differs on signed input"
+        for Ts in (expected[5], result[5]):
+            assert not np.any(np.signbit(Ts[Ts == 0])), "Simplified matrix contains -0.0"
+
+    def test_pipeline_rejects_overflowing_normalization(self):
+        """Finite input whose normalization overflows float32 raises ValueError"""
+        # Huge entries cancel, so every row/column sum is 1e-3 and D = A / 1e-3
+        A = np.array([[3e38, -3e38, 1e-3],
+                      [-3e38, 3e38, 1e-3],
+                      [1e-3, 1e-3, -1e-3]], dtype=np.float32)
+        for pipeline in (dematel_pipeline, small_dematel_pipeline):
+            with pytest.raises(ValueError, match="invalid values"):
+                pipeline(A)
+
+    def test_pipeline_keeps_float32(self):
+        """float32 input should produce float32 outputs"""
+        A = np.array([[0, 1, 2],
+                      [1, 0, 1],
+                      [2, 1, 0]], dtype=np.float32)
+
+        for out in dematel_pipeline(A):
+            assert out.dtype == np.float32, "float32 input was promoted"
+
+    def test_small_pipeline_matches_lapack_pipeline(self):
+        """Small-matrix kernel should match the LAPACK-based kernel"""
+        A = np.array([
+            [0, 1, 2, 3, 1, 0.5, 2, 1],
+            [1, 0, 1, 0.5, 2, 1, 0.5, 1],
+            [2, 1, 0, 2, 1, 1, 1, 0.5],
+            [3, 0.5, 2, 0, 1, 2, 1, 1],
+            [1, 2, 1, 1, 0, 0.5, 2, 1],
+            [0.5, 1, 1, 2, 0.5, 0, 1, 2],
+            [2, 0.5, 1, 1, 2, 1, 0, 1],
+            [1, 1, 0.5, 1, 1, 2, 1, 0]
+        ], dtype=float)
+
+        for n in (3, 4, 8):
+            expected = dematel_pipeline(A[:n, :n].copy())
+            result = small_dematel_pipeline(A[:n, :n].copy())
+            for got, want in zip(result, expected):
+                assert np.allclose(got, want), f"Small kernel differs for {n}x{n}"
+
+
+class TestMatrixInput:
+    """Test request parsing of the matrix field"""
+
+    def test_matrix_parsed_to_float32_array(self):
+        """A list of rows becomes a 2D float32 ndarray"""
+        data = MatrixInput(matrix=[[0, 1], [0.5, 0]], labels=["a", "b"])
+        assert isinstance(data.matrix, np.ndarray)
+        assert data.matrix.dtype == np.float32
+        assert data.matrix.shape == (2, 2)
+
+    @pytest.mark.parametrize("matrix", [
+        [[None, 1], [1, 0]],
+        [[{}, 1], [1, 0]],
+        [["x", 1], [1, 0]],
+        [[1, 2], [3]],
+        [1, 2],
+        [[float("nan"), 1], [1, 0]],
+        [[0, 1e39], [1, 0]],
+    ])
+    def test_malformed_matrix_rejected(self, matrix):
+        """Malformed, non-finite or float32-overflowing matrices fail validation"""
+        with pytest.raises(ValidationError):
+            MatrixInput(matrix=matrix, labels=["a", "b"])
+
+
+client = TestClient(app)
+
+# Nonsingular matrix used to cut the n x n endpoint inputs from
+ENDPOINT_MATRIX = np.array([
+    [0, 2, 2, 3, 1, 0.5, 2, 1, 0.5, 1],
+    [1, 0, 1, 0.5, 2, 1, 0.5, 1, 2, 1],
+    [2, 1, 0, 2, 1, 1, 1, 0.5, 1, 2],
+    [3, 0.5, 2, 0, 1, 2, 1, 1, 0.5, 1],
+    [1, 2, 1, 1, 0, 0.5, 2, 1, 1, 3],
+    [0.5, 1, 1, 2, 0.5, 0, 1, 2, 2, 1],
+    [2, 0.5, 1, 1, 2, 1, 0, 1, 1, 0.5],
+    [1, 1, 0.5, 1, 1, 2, 1, 0, 3, 1],
+    [0, 2, 1, 0.5, 1, 1, 2, 1, 0, 2],
+    [1, 1, 2, 1, 0.5, 3, 1, 1, 1, 0]
+])
+
+
+class TestAnalyzeEndpoint:
+    """Test the /analyze endpoint"""
+
+    @pytest.fixture(params=[dematel.run_dematel, kernels.run_dematel], ids=["numpy", "numba"])
+    def pipeline(self, request, monkeypatch):
+        """Serve requests from the cold-start NumPy path and from the compiled kernels"""
+        monkeypatch.setattr(main, "_run_dematel", request.param)
+
+    @pytest.mark.parametrize("n", [2, 5, 10])
+    def test_analyze_matches_reference(self, n, pipeline):
+        """Both pipelines, and both kernels (n=5 small, n=2 and n=10 LAPACK), match the NumPy functions"""
+        A = ENDPOINT_MATRIX[:n, :n]
+        labels = [f"C{i}" for i in range(n)]
+
+        response = client.post("/analyze", json={"matrix": A.tolist(), "labels": labels})
+        assert response.status_code == 200, response.text
+        result = response.json()
+
+        T = total_influence_matrix(normalize_matrix(A))
+        d, r, prominence, relation = prominence_relation(T)
+        weights = compute_danp_weights(T)
+        tol = dict(rtol=1e-4, atol=1e-5)
+        assert np.allclose(result["total_influence_matrix"], T, **tol)
+        assert np.allclose(result["simplified_total_influence_matrix"], simplify_matrix(T), **tol)
+        assert np.allclose(result["d"], d, **tol)
+        assert np.allclose(result["r"], r, **tol)
+        assert np.allclose(result["prominence"], prominence, **tol)
+        assert np.allclose(result["relation"], relation, **tol)
+        assert np.allclose(result["weights"], weights, **tol)
+
+        ranked = [w for _, w in result["ranking"]]
+        by_label = dict(zip(labels, result["weights"]))
+        assert all(by_label[label] == w for label, w in result["ranking"]), \
+            "Ranking weights differ from the weights array"
+        assert sorted(label for label, _ in result["ranking"]) == labels
+        assert ranked == sorted(ranked, reverse=True), "Ranking not in descending order"
+
+    @pytest.mark.parametrize("matrix", [
+        [[None, 1], [1, 0]],
+        [[{}, 1], [1, 0]],
+        [[1, 2], [3]],
+        [1, 2],
+        [[0, 1e39], [1, 0]],
+    ])
+    def test_malformed_matrix_returns_422(self, matrix):
+        """Malformed matrices are rejected during request validation"""
+        response = client.post("/analyze", json={"matrix": matrix, "labels": ["a", "b"]})
+        assert response.status_code == 422, response.text
+
+    @pytest.mark.parametrize("literal", ["NaN", "Infinity", "-Infinity"])
+    def test_non_finite_literal_returns_422(self, literal):
+        """NaN/Infinity JSON literals are rejected, and the error echo still serializes"""
+        body = '{"matrix": [[%s, 1], [1, 0]], "labels": ["a", "b"]}' % literal
+        response = client.post("/analyze", content=body, headers={"content-type": "application/json"})
+        assert response.status_code == 422, response.text
+
+    @pytest.mark.parametrize("n", [2, 3, 9])
+    def test_singular_matrix_returns_400(self, n, pipeline):
+        """Equal row sums make I - D exactly singular, on either pipeline and kernel"""
+        A = np.ones((n, n)) - np.eye(n)
+        response = client.post("/analyze", json={"matrix": A.tolist(), "labels": list("abcdefghij")[:n]})
+        assert response.status_code == 400, response.text
+        assert "singular" in response.json()["detail"].lower()
+
+    @pytest.mark.parametrize("bad", [np.nan, np.inf])
+    def test_non_finite_matrix_returns_400(self, bad):
+        """Non-finite values that bypass the schema are rejected by validate_matrix"""
+        A = np.array([[0, 1], [1, 0]], dtype=np.float32)
+        A[0, 1] = bad
+        with pytest.raises(HTTPException) as exc:
+            analyze(MatrixInput.model_construct(matrix=A, labels=["a", "b"]))
+        assert exc.value.status_code == 400
+
+    def test_tied_weights_keep_input_order(self):
+        """Criteria with equal weights are ranked in input order"""
+        A = [[0, 2, 1],
+             [2, 0, 1],
+             [1, 1, 0]]
+        for labels in (["a", "b", "c"], ["b", "a", "c"]):
+            result = client.post("/analyze", json={"matrix": A, "labels": labels}).json()
+            assert result["weights"][0] == result["weights"][1], "Expected a tie"
+            assert [label for label, _ in result["ranking"]] == labels
+
+    def test_fewer_labels_truncates_ranking(self):
+        """Only labelled criteria are ranked, as with the original zip()"""
+        A = [[0, 1, 2, 3],
+             [1, 0, 1, 1],
+             [2, 1, 0, 2],
+             [3, 1, 2, 0]]
+        result = client.post("/analyze", json={"matrix": A, "labels": ["a", "b"]}).json()
+
+        assert len(result["weights"]) == 4
+        assert [label for label, _ in result["ranking"]] == ["a", "b"]
+
 
 class TestEndToEndAnalysis:
     """Test complete analysis pipeline"""